@@ -2,34 +2,126 @@
 
 import json
 import logging
-import io
-import base64
+import functools
 import signal
+import struct
 import sys
+import threading
+import time
 import os
+from collections.abc import Callable
+from typing import Any
+from html import escape
+from urllib.parse import quote
 
+import numpy as np
 import pynvml
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+try:
+    # pybase64 is a drop-in replacement for base64 that uses SIMD instructions when available
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+try:
+    # zlib-ng is a drop-in replacement for zlib with faster compression and checksums
+    from zlib_ng import zlib_ng as zlib
+except ImportError:
+    import zlib
+
+try:
+    # orjson is much faster than json at serializing the (large) image payloads
+    import orjson
+
+    def dumps(obj) -> str:
+        # The WebSocket expects text frames, so the bytes returned by orjson are decoded
+        return orjson.dumps(obj).decode("utf-8")
+except ImportError:
+    dumps = json.dumps
 
 import plugin
 
 pynvml.nvmlInit()
 
-logging.basicConfig(level=logging.DEBUG)
+
+def get_log_level() -> int | None:
+    """
+    Get the log level from the SDPLUGIN_LOG environment variable, which can be a level name or number
+    :return: The log level, or None if it isn't a valid level
+    """
+    value = (os.environ.get("SDPLUGIN_LOG") or "WARNING").strip().upper()
+    if value.isdigit():
+        return int(value)
+
+    level = logging.getLevelName(value)
+    return level if isinstance(level, int) else None
+
+
+# Only warnings and errors are logged by default, set SDPLUGIN_LOG (such as to DEBUG) for more
+log_level = get_log_level()
+logging.basicConfig(level=logging.WARNING if log_level is None else log_level)
+if log_level is None:
+    logging.warning("Unknown log level %r in SDPLUGIN_LOG, falling back to WARNING.", os.environ.get("SDPLUGIN_LOG"))
 
 # Get the font from the plugin directory
 PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
 FONT_PATH = os.path.join(os.path.join(PLUGIN_DIR, "fonts"), "DejaVuSans-Bold.ttf")
 
 try:
+    # The same size that the base plugin's generate_button_img draws the values with
+    value_font = ImageFont.truetype(FONT_PATH, 16)
     wattage_font = ImageFont.truetype(FONT_PATH, 12)
 except OSError:
     # Fallback if the font path is wrong
     logging.warning("Font file not found, falling back to default.")
+    value_font = ImageFont.load_default()
     wattage_font = ImageFont.load_default()
 
+# FreeTypeFont objects aren't reliably hashable, so the image cache refers to fonts by their index in this tuple
+VALUE_FONT = 0
+WATTAGE_FONT = 1
+_FONTS = (value_font, wattage_font)
+_FONT_SIZES = tuple(getattr(font, "size", 12) for font in _FONTS)
+
+# Send images as SVG instead of PNG. The text is then rendered by the host using its own copy of the font.
+USE_SVG = os.environ.get("GPU_USAGE_SVG", "0") == "1"
+
+SVG_TEMPLATE = ('<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}">'
+                '<text x="50%" y="50%" fill="{color}" font-family="DejaVu Sans" font-weight="bold" font-size="{size}" '
+                'text-anchor="middle" dominant-baseline="central">{text}</text></svg>')
+
+# Every character that the buttons can display, pre-rendered into the glyph atlas at startup
+GLYPHS = "0123456789.% GBW°CTrueFals"
+
+# How often (in seconds) the buttons are updated, and how often once every GPU is idle
+LOOP_INTERVAL = 1
+IDLE_LOOP_INTERVAL = 5
+# How many ticks in a row a GPU must be idle before slowing down
+IDLE_TICKS = 5
+# Metrics that are allowed to change while a GPU is idle
+IDLE_IGNORED_METRICS = {"power_usage"}
+# How many loop intervals old a GPU's metrics can get (such as when the sampler thread keeps failing) before on_loop
+# polls NVML itself
+STALE_INTERVALS = 3
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_DATA_URL_PREFIX = b"data:image/png;base64,"
+
+# Images are 4-bit palette PNGs, where each palette entry is the text color with a different opacity
+PALETTE_LEVELS = 16
+
+
+# The running plugin, so that the signal handler can stop its sampler thread before shutting down NVML
+gpu_plugin = None
+
 
 def handle_signal(sig, frame):
+    if gpu_plugin is not None:
+        # Don't wait forever, the sampler may be waiting on a lock that this (interrupted) thread holds, or be stuck
+        # in a slow NVML call
+        gpu_plugin.stop_sampler(timeout=gpu_plugin.sd.loop_interval)
+
     try:
         pynvml.nvmlShutdown()
     except pynvml.NVML_ERROR_UNINITIALIZED:
@@ -37,11 +129,21 @@ def handle_signal(sig, frame):
     sys.exit(0)
 
 
+# List of GPUs, filled in the first time get_gpus() is called, as the names and UUIDs never change
+_GPUS_CACHE: list[dict] | None = None
+# NVML handles of the GPUs in _GPUS_CACHE, by UUID
+_HANDLE_BY_UUID: dict[str, object] = {}
+
+
 def get_gpus() -> list[dict]:
     """
-    Get a list of NVIDIA GPUs currently available to the system
-    :return: List of NVIDIA GPUs containing the name and UUID of the GPU
+    Get a list of NVIDIA GPUs currently available to the system. The list is only queried from NVML once.
+    :return: List of NVIDIA GPUs containing the name, UUID and NVML handle of the GPU
     """
+    global _GPUS_CACHE, _HANDLE_BY_UUID
+    if _GPUS_CACHE is not None:
+        return _GPUS_CACHE
+
     devices = []
     count = pynvml.nvmlDeviceGetCount()
 
@@ -50,9 +152,262 @@ def get_gpus() -> list[dict]:
         name = pynvml.nvmlDeviceGetName(handle)
         uuid = pynvml.nvmlDeviceGetUUID(handle)
 
-        devices.append({"name": name, "uuid": uuid})
+        devices.append({"name": name, "uuid": uuid, "handle": handle})
+
+    _GPUS_CACHE = devices
+    _HANDLE_BY_UUID = {device["uuid"]: device["handle"] for device in devices}
     return devices
 
+
+def get_gpu_handle(uuid: str):
+    """
+    Get the NVML handle of a GPU. This uses the handles from get_gpus(), as looking up a handle by UUID makes NVML
+    search through every GPU.
+    :param uuid: UUID of the GPU
+    :return: The NVML handle of the GPU, or None if there is no GPU with that UUID
+    """
+    get_gpus()
+    return _HANDLE_BY_UUID.get(uuid)
+
+
+def invalidate_gpus_cache():
+    """
+    Forget the cached list of GPUs, so that the next call to get_gpus() queries NVML again (such as after a GPU was
+    added or removed)
+    """
+    global _GPUS_CACHE, _HANDLE_BY_UUID
+    _GPUS_CACHE = None
+    _HANDLE_BY_UUID = {}
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """
+    Build a PNG chunk (length, type, data and CRC)
+    :param chunk_type: Four byte chunk type, such as b"IHDR"
+    :param data: Chunk data
+    :return: The encoded chunk
+    """
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+PNG_IEND = png_chunk(b"IEND", b"")
+# CRC of the IDAT chunk type, which the CRC of each IDAT chunk's data continues from
+IDAT_CRC = zlib.crc32(b"IDAT")
+# zlib stream header for the fastest compression level with a 32K window, so that raw deflate data can be wrapped
+ZLIB_HEADER = b"\x78\x01"
+
+
+def png_header(width: int, height: int) -> bytes:
+    """
+    Get the PNG signature and IHDR chunk for a 4-bit palette image
+    :param width: Width of the image
+    :param height: Height of the image
+    :return: The encoded signature and IHDR chunk
+    """
+    return PNG_SIGNATURE + png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 4, 3, 0, 0, 0))
+
+
+def png_palette(color: tuple[int, int, int]) -> bytes:
+    """
+    Get the PLTE and tRNS chunks for the given text color. Every palette entry is the text color, with the opacity
+    increasing from fully transparent to fully opaque.
+    :param color: RGB color of the text
+    :return: The encoded PLTE and tRNS chunks
+    """
+    opacity = bytes(round(level * 255 / (PALETTE_LEVELS - 1)) for level in range(PALETTE_LEVELS))
+    return png_chunk(b"PLTE", bytes(color) * PALETTE_LEVELS) + png_chunk(b"tRNS", opacity)
+
+
+@functools.lru_cache
+def png_shell(width: int, height: int, color: tuple[int, int, int]) -> bytes:
+    """
+    Get everything that comes before the image data in a PNG (the signature, IHDR, PLTE and tRNS chunks), which only
+    changes with the image size and text color. Each image is then just this, one IDAT chunk, and PNG_IEND.
+    :param width: Width of the image
+    :param height: Height of the image
+    :param color: RGB color of the text
+    :return: The encoded start of the PNG
+    """
+    return png_header(width, height) + png_palette(color)
+
+
+def idat_chunk(raw: bytes) -> bytes:
+    """
+    Build the IDAT chunk for the given scanlines. The data is compressed as raw deflate and wrapped in the zlib
+    framing here, and the CRC continues from the precomputed CRC of the chunk type.
+    :param raw: Scanlines, including the filter type byte of each row
+    :return: The encoded chunk
+    """
+    compressor = zlib.compressobj(1, zlib.DEFLATED, -15)
+    data = ZLIB_HEADER + compressor.compress(raw) + compressor.flush() + struct.pack(">I", zlib.adler32(raw))
+    return struct.pack(">I", len(data)) + b"IDAT" + data + struct.pack(">I", zlib.crc32(data, IDAT_CRC))
+
+
+# Maps an 8-bit alpha value to the closest palette entry
+_ALPHA_TO_PALETTE = np.array([round(alpha * (PALETTE_LEVELS - 1) / 255) for alpha in range(256)], np.uint8)
+
+# Image buffers for each image size, kept per thread so they can be reused between images
+_TLS = threading.local()
+
+
+def get_buffers(width: int, height: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get this thread's reusable image buffers for the given image size
+    :param width: Width of the image
+    :param height: Height of the image
+    :return: Alpha buffer with the shape (height, width rounded up to be even), and the scanline buffer with the shape
+    (height, width / 2 + 1); the first byte of each scanline is the PNG filter type
+    """
+    buffers = getattr(_TLS, "buffers", None)
+    if buffers is None:
+        buffers = _TLS.buffers = {}
+
+    image_buffers = buffers.get((width, height))
+    if image_buffers is None:
+        # Two pixels are packed into each byte, so any padding column is left transparent.
+        # The filter type is always 0 (None), so it's never written after this.
+        padded_width = width + width % 2
+        image_buffers = buffers[(width, height)] = (np.zeros((height, padded_width), np.uint8),
+                                                    np.zeros((height, padded_width // 2 + 1), np.uint8))
+    return image_buffers
+
+
+def encode_png(alpha: np.ndarray, scanlines: np.ndarray, width: int, color: tuple[int, int, int]) -> bytes:
+    """
+    Encode the text's alpha mask as a 4-bit palette PNG. No row filtering is done and the fastest compression level
+    is used, as the images are tiny and mostly empty.
+    :param alpha: Alpha buffer from get_buffers() containing the text
+    :param scanlines: Scanline buffer from get_buffers()
+    :param width: Width of the image
+    :param color: RGB color of the text
+    :return: The encoded PNG
+    """
+    levels = _ALPHA_TO_PALETTE[alpha]
+    scanlines[:, 1:] = (levels[:, 0::2] << 4) | levels[:, 1::2]
+
+    return png_shell(width, alpha.shape[0], color) + idat_chunk(scanlines.tobytes()) + PNG_IEND
+
+
+def render_glyph(font: ImageFont.FreeTypeFont, char: str) -> tuple[np.ndarray, int, int, float]:
+    """
+    Rasterize a single character
+    :param font: Font to render the character with
+    :param char: The character to render
+    :return: Alpha mask of the glyph, its offset from the pen position and ascender line, and its advance width
+    """
+    left, top, right, bottom = font.getbbox(char)
+    if right <= left or bottom <= top:
+        # Nothing to draw (such as a space), just move the pen
+        return np.zeros((0, 0), np.uint8), 0, 0, font.getlength(char)
+
+    mask = Image.new("L", (right - left, bottom - top))
+    ImageDraw.Draw(mask).text((-left, -top), char, fill=255, font=font)
+    return np.asarray(mask), left, top, font.getlength(char)
+
+
+# Distance from the ascender line to the middle of each font (halfway between the ascender and descender)
+_FONT_MIDDLES = tuple(sum(font.getmetrics()) // 2 for font in _FONTS)
+
+# Glyph atlas, keyed by (font ID, character)
+_GLYPHS = {(font_id, char): render_glyph(font, char) for font_id, font in enumerate(_FONTS) for char in GLYPHS}
+
+
+def get_glyph(font_id: int, char: str) -> tuple[np.ndarray, int, int, float]:
+    """
+    Get a glyph from the atlas, rendering it if it wasn't pre-rendered at startup
+    :param font_id: Index of the font in _FONTS
+    :param char: The character to get
+    :return: See render_glyph
+    """
+    glyph = _GLYPHS.get((font_id, char))
+    if glyph is None:
+        glyph = _GLYPHS[(font_id, char)] = render_glyph(_FONTS[font_id], char)
+    return glyph
+
+
+@functools.lru_cache(maxsize=256)
+def text_mask(text: str, font_id: int) -> tuple[np.ndarray, int, int]:
+    """
+    Compose the alpha mask of a string from the glyph atlas. This doesn't depend on the color or image size, so the
+    same mask is reused whenever the text is displayed again.
+    :param text: Text to render
+    :param font_id: Index of the font in _FONTS
+    :return: Alpha mask of the text, and the offset of its top left corner from the center of the image
+    """
+    glyphs = [get_glyph(font_id, char) for char in text]
+
+    # Position each glyph relative to the start of the text and the ascender line
+    positions = []
+    pen_x = 0.0
+    for mask, left, top, advance in glyphs:
+        if mask.size:
+            positions.append((mask, int(pen_x + 0.5) + left, top))
+        pen_x += advance
+
+    if not positions:
+        return np.zeros((0, 0), np.uint8), 0, 0
+
+    min_x = min(x for _, x, _ in positions)
+    min_y = min(y for _, _, y in positions)
+    max_x = max(x + mask.shape[1] for mask, x, _ in positions)
+    max_y = max(y + mask.shape[0] for mask, _, y in positions)
+
+    composed = np.zeros((max_y - min_y, max_x - min_x), np.uint8)
+    for mask, x, y in positions:
+        region = composed[y - min_y:y - min_y + mask.shape[0], x - min_x:x - min_x + mask.shape[1]]
+        np.maximum(region, mask, out=region)
+
+    # Pillow truncates the anchor offsets, so do the same to line up with its output
+    return composed, min_x - int(pen_x / 2), min_y - _FONT_MIDDLES[font_id]
+
+
+def render_text(text: str, color: tuple[int, int, int], font_id: int, width: int, height: int) -> bytes:
+    """
+    Render text centered (the same as Pillow's "mm" anchor) onto a transparent image
+    :param text: Text to render
+    :param color: RGB color of the text
+    :param font_id: Index of the font in _FONTS
+    :param width: Width of the image
+    :param height: Height of the image
+    :return: The image encoded as a PNG
+    """
+    mask, offset_x, offset_y = text_mask(text, font_id)
+    x = width // 2 + offset_x
+    y = height // 2 + offset_y
+
+    alpha, scanlines = get_buffers(width, height)
+    alpha.fill(0)
+
+    # Clip the text to the image
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + mask.shape[1], width), min(y + mask.shape[0], height)
+    if x0 < x1 and y0 < y1:
+        alpha[y0:y1, x0:x1] = mask[y0 - y:y1 - y, x0 - x:x1 - x]
+
+    return encode_png(alpha, scanlines, width, color)
+
+
+@functools.lru_cache(maxsize=256)
+def generate_button_img(text: str, color: str = "cyan", font_id: int = VALUE_FONT, width: int = 72,
+                        height: int = 72) -> str:
+    """
+    Generate a button image with the given text centered on it. Results are cached, as the same values tend to be
+    displayed for many ticks in a row.
+    :param text: Text to display on the button
+    :param color: Color of the text
+    :param font_id: Index of the font to use in _FONTS (VALUE_FONT or WATTAGE_FONT)
+    :param width: Width of the image
+    :param height: Height of the image
+    :return: Base64 encoded PNG image as a data URL, or a URL-encoded SVG if USE_SVG is set
+    """
+    if USE_SVG:
+        svg = SVG_TEMPLATE.format(w=width, h=height, color=color, size=_FONT_SIZES[font_id], text=escape(text))
+        return f"data:image/svg+xml;charset=utf8,{quote(svg)}"
+
+    png = render_text(text, ImageColor.getrgb(color)[:3], font_id, width, height)
+    # The data URL is built as bytes and only decoded once; base64 is always ASCII
+    return (PNG_DATA_URL_PREFIX + base64.b64encode(png)).decode("ascii")
+
 class GPUUsage(plugin.SDPlugin):
     def __init__(self, port: int, info: str, uuid: str, event: str):
         """
@@ -62,17 +417,42 @@ class GPUUsage(plugin.SDPlugin):
         :param event: Event string received from the API
         """
         super().__init__(port, info, uuid, event)
-        self.handles = {} # Store the NVML handles based on the UUID of the GPU, that way multiple cards should work
         self.gpus = {} # Store the GPU UUIDs for each context, in case the GPU was never set in the settings
+        self._info_cache: dict[str, tuple[float, dict]] = {} # Latest GPU metrics and when they were polled, by GPU UUID
+
+        # Each action is the GPU metric it displays, and a function returning the text, color and font ID to display
+        # for the value of that metric
+        self._actions: dict[str, tuple[str, Callable]] = {
+            "usage": ("gpu_usage", lambda value: (f"{value}%", "cyan", VALUE_FONT)),
+            "vram_total": ("vram_total", lambda value: (f"{value} GB", "cyan", VALUE_FONT)),
+            "vram_used": ("vram_used", lambda value: (f"{value} GB", "cyan", VALUE_FONT)),
+            "vram_usage": ("vram_usage", lambda value: (f"{value}%", "cyan", VALUE_FONT)),
+            # Use a smaller font for the wattage
+            "power_usage": ("power_usage", lambda value: (f"{value} W", "cyan", WATTAGE_FONT)),
+            # Displays "True" or "False" based on whether the GPU is throttling or not
+            # If it is throttling, the text is also red
+            "throttle": ("throttle", lambda value: ("True" if value else "False", "red" if value else "cyan",
+                                                  VALUE_FONT)),
+            "temperature": ("temperature", lambda value: (f"{value}°C", "cyan", VALUE_FONT)),
+        }
+        self._last_value: dict[str, Any] = {} # Last value displayed by each context, to skip redrawing unchanged values
+
+        self._idle_ticks: dict[str, int] = {} # How many ticks in a row each GPU has been idle for, by GPU UUID
+
+        self.sd.loop_interval = LOOP_INTERVAL # Override the loop interval to 1 second
 
-        self.sd.loop_interval = 1 # Override the loop interval to 1 second
+        # Poll the GPUs on a separate thread; the results are published in self._info_cache
+        self._poll_lock = threading.Lock()
+        self._stop_sampler = threading.Event()
+        self._sampler = threading.Thread(target=self.sample_loop, daemon=True)
+        self._sampler.start()
 
     def get_gpu_info(self, context: str):
-        if context not in self.gpus:
-            self.gpus[context] = {}
+        # Get the GPU from the settings, or the one that was previously picked for this context
+        settings = self.ctxSettings.get(context) or {}
+        uuid = settings.get("gpu") or self.gpus.get(context)
 
-        # Get the GPU information from the settings, or use the first available one if needed
-        if not self.gpus[context] and "gpu" not in self.ctxSettings[context]:
+        if not uuid:
             # If no GPU has been set yet, use the first available one
             self.logger.debug("Using first available GPU, as no GPU has been set")
             gpus = get_gpus()
@@ -81,25 +461,33 @@ class GPUUsage(plugin.SDPlugin):
                 self.logger.error("No compatible GPUs found!")
                 return None
             uuid = gpus[0]["uuid"]
-        elif "gpu" in self.ctxSettings[context]:
-            uuid = self.ctxSettings[context]["gpu"]
-        else:
-            uuid = self.gpus[context]
-
-        # Update the UUID for the context if needed
-        if not self.gpus[context]:
-            self.gpus[context] = uuid
-
-        # Get the handle and update it if needed
-        if uuid not in self.handles:
-            try:
-                self.handles[uuid] = pynvml.nvmlDeviceGetHandleByUUID(uuid)
-            except pynvml.NVML_ERROR_NOT_FOUND:
-                self.logger.error(f"GPU not found for UUID {uuid}")
-                return None
 
-        handle = self.handles[uuid]
+        # Remember the UUID for the context
+        self.gpus[context] = uuid
+
+        # Get the handle, that way multiple cards should work
+        handle = get_gpu_handle(uuid)
+        if handle is None:
+            self.logger.error("GPU not found for UUID %s", uuid)
+            return None
+
+        # The sampler thread keeps the metrics up to date, so only poll here if it hasn't gotten to this GPU yet, or
+        # hasn't managed to for a while. Any NVML errors are then raised here, like they would be without the sampler.
+        cached = self._info_cache.get(uuid)
+        if cached and time.monotonic() - cached[0] < STALE_INTERVALS * self.sd.loop_interval:
+            return cached[1]
 
+        return self.poll_gpu(uuid, handle)
+
+    def poll_gpu(self, uuid: str, handle) -> dict:
+        """
+        Get the current metrics of a GPU from NVML, and publish them to the cache
+        :param uuid: UUID of the GPU
+        :param handle: NVML handle of the GPU
+        :return: The metrics of the GPU
+        """
+        # These can't be batched with nvmlDeviceGetFieldValues, as NVML has no field IDs for the memory info,
+        # utilization, current temperature or throttle reasons; only the power usage could be fetched that way
         mem = pynvml.nvmlDeviceGetMemoryInfo(handle) # VRAM info
         util = pynvml.nvmlDeviceGetUtilizationRates(handle) # Utilization info
         power_mw = pynvml.nvmlDeviceGetPowerUsage(handle) # Power usage in mW
@@ -117,7 +505,7 @@ class GPUUsage(plugin.SDPlugin):
 
         power = power_mw / 1000.0
 
-        return {
+        result = {
             "vram_total": round(total_gb, 2),
             "vram_used": round(used_gb, 2),
             "vram_usage": round(vram_percent, 1),
@@ -127,6 +515,75 @@ class GPUUsage(plugin.SDPlugin):
             "temperature": temp
         }
 
+        with self._poll_lock:
+            cached = self._info_cache.get(uuid)
+            # Replacing the entry is atomic, so on_loop can read the cache without taking the lock
+            self._info_cache[uuid] = (time.monotonic(), result)
+            self.update_loop_interval(uuid, cached[1] if cached else None, result)
+        return result
+
+    def sample_loop(self):
+        """
+        Poll every GPU that is being displayed in the background, so that on_loop never waits on NVML
+        :return: None
+        """
+        while not self._stop_sampler.wait(self.sd.loop_interval):
+            for uuid in self.active_gpus():
+                try:
+                    handle = get_gpu_handle(uuid)
+                    if handle is None:
+                        continue
+
+                    self.poll_gpu(uuid, handle)
+                except pynvml.NVMLError as e:
+                    self.logger.error("Failed to get the metrics for GPU %s: %s", uuid, e)
+                except Exception:
+                    # Keep the thread alive, on_loop polls NVML itself if the metrics get too old
+                    self.logger.exception("Unexpected error while getting the metrics for GPU %s", uuid)
+
+    def active_gpus(self) -> set[str]:
+        """
+        Get the GPUs that are displayed by at least one context
+        :return: UUIDs of the GPUs
+        """
+        # The set is a copy, as on_loop may change self.gpus while the sampler thread is using it
+        return set(self.gpus.values())
+
+    def stop_sampler(self, timeout: float | None = None):
+        """
+        Stop the sampler thread and wait for it to exit
+        :param timeout: How long to wait for the thread to exit (in seconds), or None to wait until it does
+        :return: None
+        """
+        self._stop_sampler.set()
+        self._sampler.join(timeout)
+
+    def update_loop_interval(self, uuid: str, previous: dict | None, current: dict):
+        """
+        Poll less often once every GPU has been idle for a while, and go back to the normal interval as soon as one
+        of them isn't
+        :param uuid: UUID of the GPU that was polled
+        :param previous: The previous metrics of the GPU, if any
+        :param current: The metrics that were just polled
+        :return: None
+        """
+        # Every metric other than the power usage (which is almost never exactly the same twice) has to be unchanged.
+        # The throttle state is compared rather than required to be False, as idle GPUs report that they're throttling.
+        idle = (previous is not None and current["gpu_usage"] == 0 and
+                all(value == previous[key] for key, value in current.items() if key not in IDLE_IGNORED_METRICS))
+        self._idle_ticks[uuid] = self._idle_ticks.get(uuid, 0) + 1 if idle else 0
+
+        # Forget GPUs that aren't displayed anymore, so that they can't keep the normal interval forever
+        active = self.active_gpus()
+        for stale_uuid in [key for key in self._idle_ticks if key not in active]:
+            del self._idle_ticks[stale_uuid]
+
+        # With no GPUs left there's nothing that is idle, so keep the normal interval for the next button to appear
+        if self._idle_ticks and all(ticks > IDLE_TICKS for ticks in self._idle_ticks.values()):
+            self.sd.loop_interval = IDLE_LOOP_INTERVAL
+        else:
+            self.sd.loop_interval = LOOP_INTERVAL
+
     def get_settings(self, context: str):
         """
         Retrieves the settings associated with the given context
@@ -159,8 +616,8 @@ class GPUUsage(plugin.SDPlugin):
         #                                           "value": nickname})
 
         payload = {"context": context, "event": "sendToPropertyInspector", "payload": settings}
-        self.logger.debug(f"Sending payload to PI: {payload}")
-        self.sd.socket.send(json.dumps(payload))
+        self.logger.debug("Sending payload to PI: %s", payload)
+        self.sd.socket.send(dumps(payload))
 
     def on_loop(self, context: str):
         info = self.ctxInfo.get(context)
@@ -168,49 +625,59 @@ class GPUUsage(plugin.SDPlugin):
 
         if not info or not gpu_info: return
 
-        action = info["action"].split(".")[-1]
+        # The action only needs to be shortened (such as "me.adamculbertson.gpuusage.usage" to "usage") once
+        short_action = info.get("_short_action")
+        if short_action is None:
+            short_action = info["_short_action"] = info["action"].rsplit(".", 1)[-1]
 
-        if action == "usage":
-            img = plugin.generate_button_img(f"{gpu_info["gpu_usage"]}%")
-            self.SetImage(context, img)
+        action = self._actions.get(short_action)
+        if action is None:
+            return
 
-        elif action == "vram_total":
-            img = plugin.generate_button_img(f"{gpu_info['vram_total']} GB")
-            self.SetImage(context, img)
+        key, render = action
+        value = gpu_info[key]
 
-        elif action == "vram_used":
-            img = plugin.generate_button_img(f"{gpu_info['vram_used']} GB")
-            self.SetImage(context, img)
+        # Only draw and send the image if the value has changed since the last tick
+        if context in self._last_value and self._last_value[context] == value:
+            return
 
-        elif action == "vram_usage":
-            img = plugin.generate_button_img(f"{gpu_info['vram_usage']}%")
-            self.SetImage(context, img)
+        img = generate_button_img(*render(value))
+        self.SetImage(context, img)
+        self._last_value[context] = value
 
-        elif action == "power_usage":
-            # Use a smaller font for the wattage
-            img = plugin.generate_button_img(f"{gpu_info['power_usage']} W", font=wattage_font)
-            self.SetImage(context, img)
+    # Plugin overrides
+    def SetImage(self, context: str, image: str, target: int = 0, state: int | None = None):
+        """
+        Sets the image of the given context. Overridden so that the payload, which is sent every time a value
+        changes, is serialized with orjson when it is available. The base plugin isn't part of this repository, so the
+        payload follows the setImage event of the Stream Deck SDK rather than being checked against the base plugin.
+        :param context: Stream Deck context, provided by the WebSocket API
+        :param image: The image, as a data URL
+        :param target: Where to display the image (0 for the hardware and software, 1 for hardware, 2 for software)
+        :param state: The state to set the image for, or None for all states
+        :return: None
+        """
+        payload = {"image": image, "target": target}
+        if state is not None:
+            payload["state"] = state
 
-        elif action == "throttle":
-            # Displays "True" or "False" based on whether the GPU is throttling or not
-            # If it is throttling, the text is also red
-            throttle = gpu_info["throttle"]
-            color = "red" if throttle else None
-            if throttle:
-                text = "True"
-            else:
-                text = "False"
-            img = plugin.generate_button_img(text, color=color)
-            self.SetImage(context, img)
-
-        elif action == "temperature":
-            img = plugin.generate_button_img(f"{gpu_info['temperature']}°C")
-            self.SetImage(context, img)
+        self.sd.socket.send(dumps({"event": "setImage", "context": context, "payload": payload}))
 
-        else:
-            return
+    def onWillAppear(self, payload: dict):
+        super().onWillAppear(payload)
+        context = payload["context"]
+
+        # The button is showing its default image again, so the next tick must send a fresh one
+        self._last_value.pop(context, None)
+
+    def onWillDisappear(self, payload: dict):
+        super().onWillDisappear(payload)
+        context = payload["context"]
+
+        # Stop polling the GPU of the context, unless another context is still displaying it
+        self.gpus.pop(context, None)
+        self._last_value.pop(context, None)
 
-    # Plugin overrides
     def onSendToPlugin(self, payload: dict):
         context = payload["context"]
 
@@ -238,6 +705,7 @@ if __name__ == "__main__":
 
     gpu_plugin = GPUUsage(args.port, args.info, args.pluginUUID, args.registerEvent)
     gpu_plugin.run()
+    gpu_plugin.stop_sampler()
 
     try:
         pynvml.nvmlShutdown()